@@ -1,126 +1,259 @@
 import streamlit as st
+import json
+import orjson
+import urllib.parse
 import requests
 import yfinance as yf
 import pandas as pd
-import matplotlib.pyplot as plt
-from datetime import datetime
-from textblob import TextBlob
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from streamlit_autorefresh import st_autorefresh
 
 ###############################
 # 0. PAGE & AUTO-REFRESH SETUP
 ###############################
+REFRESH_INTERVAL_SECONDS = 60
+
 st.set_page_config(page_title="MarketPulse: Live Finance & Crypto", layout="wide")
-st_autorefresh(interval=60_000, limit=None)
+st_autorefresh(interval=REFRESH_INTERVAL_SECONDS * 1000, limit=None)
 st.title("MarketPulse: Live Finance & Crypto")
 
 ###################################################
 # 1. HELPER FUNCTIONS & STREAMLIT CACHING DECORATORS
 ###################################################
 
-@st.cache_data(ttl=60)
+def _script_ctx_pool(max_workers):
+    """
+    Thread pool whose workers carry this run's script context. Workers never
+    call st.* (cached fetchers use show_spinner=False), so the shared context
+    only silences Streamlit's missing-ScriptRunContext warning.
+    """
+    return ThreadPoolExecutor(max_workers=max_workers, initializer=add_script_run_ctx, initargs=(None, get_script_run_ctx()))
+
+@st.cache_resource(show_spinner=False)
+def get_http_session():
+    """Shared HTTP session so all API calls reuse pooled keep-alive connections."""
+    s = requests.Session()
+    s.mount("https://", requests.adapters.HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=2))
+    return s
+
+@st.cache_data(ttl=60, show_spinner=False)
 def fetch_crypto_data(crypto_symbols):
-    """Fetch real-time crypto data from Binance."""
-    results = []
-    for symbol in crypto_symbols:
-        url = f"https://api.binance.com/api/v3/ticker/24hr?symbol={symbol}"
-        resp = requests.get(url)
-        if resp.status_code == 200:
-            data = resp.json()
-            results.append({
-                "Symbol": data.get("symbol"),
-                "Name": crypto_names.get(symbol, "N/A"),
-                "Price Change (%)": data.get("priceChangePercent") + "%",
-                "Last Price": data.get("lastPrice"),
-                "Volume": data.get("volume"),
-                "High Price": data.get("highPrice"),
-                "Low Price": data.get("lowPrice")
-            })
-    return pd.DataFrame(results)
-
-@st.cache_data(ttl=60)
+    """Fetch real-time crypto data from Binance in a single batched request."""
+    if not crypto_symbols:
+        return pd.DataFrame()
+    url = (
+        "https://api.binance.com/api/v3/ticker/24hr?symbols="
+        + urllib.parse.quote(json.dumps(list(crypto_symbols), separators=(",", ":")))
+    )
+    resp = get_http_session().get(url, timeout=5)
+    syms, names, pct, last, vol, high, low = [], [], [], [], [], [], []
+    if resp.status_code == 200:
+        for data in orjson.loads(resp.content):
+            symbol = data.get("symbol")
+            syms.append(symbol)
+            names.append(crypto_names.get(symbol, "N/A"))
+            pct.append(data.get("priceChangePercent"))
+            last.append(data.get("lastPrice"))
+            vol.append(data.get("volume"))
+            high.append(data.get("highPrice"))
+            low.append(data.get("lowPrice"))
+    # Binance sends numbers as strings; store them numeric so the table sorts and
+    # renders as numbers, and Symbol as a category. Prices stay float64 to keep
+    # Binance's 8 decimals. downcast="float" picks float32 whenever every value
+    # is within 5e-4 of the original, which is fine for the % change and volume.
+    return pd.DataFrame({
+        "Symbol": pd.Categorical(syms),
+        "Name": names,
+        "Price Change (%)": pd.to_numeric(pct, downcast="float"),
+        "Last Price": pd.to_numeric(last),
+        "Volume": pd.to_numeric(vol, downcast="float"),
+        "High Price": pd.to_numeric(high),
+        "Low Price": pd.to_numeric(low)
+    })
+
+def _klines_to_df(klines):
+    """Turn raw Binance klines into a Close-price DataFrame indexed by date."""
+    if not klines:
+        return pd.DataFrame()
+    arr = np.asarray(klines, dtype=object)
+    dates = pd.to_datetime(arr[:, 0].astype(np.int64), unit="ms").date
+    closes = arr[:, 4].astype(np.float64)
+    return pd.DataFrame({"Close": closes}, index=pd.Index(dates, name="Date"))
+
+# Closed-day history is always fetched at this fixed depth, so the disk cache
+# is keyed only by (symbol, date) and every `days` value shares one entry.
+# Streamlit writes one pickle per key under .streamlit/cache and never deletes
+# them; max_entries only bounds the in-memory layer. Expect one small file per
+# symbol (or stock symbol set) per day, and clear that directory (or run
+# `streamlit cache clear`) if it grows too large.
+MAX_HISTORY_DAYS = 90
+
+@st.cache_data(persist="disk", max_entries=256, show_spinner=False)
+def _fetch_closed_days(symbol, end_date):
+    """
+    Fetch the MAX_HISTORY_DAYS closed 1-day klines before end_date (UTC).
+    Closed bars never change, so this is persisted to disk and keyed by end_date.
+    """
+    end_ms = int(datetime(end_date.year, end_date.month, end_date.day, tzinfo=timezone.utc).timestamp() * 1000) - 1
+    url = f"https://api.binance.com/api/v3/klines?symbol={symbol}&interval=1d&endTime={end_ms}&limit={MAX_HISTORY_DAYS}"
+    resp = get_http_session().get(url, timeout=5)
+    resp.raise_for_status()
+    return _klines_to_df(orjson.loads(resp.content))
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_today_partial(symbol):
+    """Fetch today's still-open 1-day kline."""
+    url = f"https://api.binance.com/api/v3/klines?symbol={symbol}&interval=1d&limit=1"
+    resp = get_http_session().get(url, timeout=5)
+    resp.raise_for_status()
+    return _klines_to_df(orjson.loads(resp.content))
+
 def fetch_crypto_historical(symbol, days=30):
     """Fetch historical data (1-day klines) for the last X days from Binance."""
-    url = f"https://api.binance.com/api/v3/klines?symbol={symbol}&interval=1d&limit={days}"
-    resp = requests.get(url)
-    if resp.status_code == 200:
-        klines = resp.json()
-        dates = [datetime.fromtimestamp(k[0]/1000).date() for k in klines]
-        closes = [float(k[4]) for k in klines]
-        df = pd.DataFrame({"Date": dates, "Close": closes})
-        df.set_index("Date", inplace=True)
-        return df
-    return pd.DataFrame()
-
-@st.cache_data(ttl=60)
+    today = datetime.now(timezone.utc).date()
+    try:
+        closed = _fetch_closed_days(symbol, today)
+        partial = _fetch_today_partial(symbol)
+    except (requests.RequestException, orjson.JSONDecodeError):
+        return pd.DataFrame()
+    return pd.concat([closed.tail(days - 1), partial])
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_all_crypto_historical(crypto_symbols, days=30):
+    """Fetch historical data for every symbol in parallel, keyed by symbol."""
+    if not crypto_symbols:
+        return {}
+    with _script_ctx_pool(len(crypto_symbols)) as ex:
+        return dict(zip(crypto_symbols, ex.map(lambda s: fetch_crypto_historical(s, days), crypto_symbols)))
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def fetch_stock_name(symbol):
+    """Fetch a stock's long name; slow scrape, so cached for a day."""
+    return yf.Ticker(symbol).info.get("longName", symbol)
+
+def _fetch_one_stock(symbol):
+    """Fetch (name, last price, previous close, market cap) for one symbol."""
+    # fast_info fields are fetched lazily, one request each
+    fi = yf.Ticker(symbol).fast_info
+    return fetch_stock_name(symbol), fi["last_price"], fi["previous_close"], fi["market_cap"]
+
+@st.cache_data(ttl=60, show_spinner=False)
 def fetch_stock_data(stock_symbols):
-    """Fetch real-time stock data from yfinance."""
-    results = []
-    for symbol in stock_symbols:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
-        results.append({
-            "Symbol": symbol,
-            "Name": info.get("longName", symbol),
-            "Current Price": info.get("regularMarketPrice"),
-            "Previous Close": info.get("previousClose"),
-            "Market Cap": info.get("marketCap")
-        })
-    return pd.DataFrame(results)
-
-@st.cache_data(ttl=60)
-def fetch_stock_historical(symbol, period="1mo"):
-    """Fetch historical data from yfinance."""
-    ticker = yf.Ticker(symbol)
-    hist = ticker.history(period=period)
+    """Fetch real-time stock data from yfinance, one symbol per worker thread."""
+    if not stock_symbols:
+        return pd.DataFrame()
+    with _script_ctx_pool(len(stock_symbols)) as ex:
+        names, last, prev, cap = zip(*ex.map(_fetch_one_stock, stock_symbols))
+    return pd.DataFrame({
+        "Symbol": list(stock_symbols),
+        "Name": list(names),
+        "Current Price": pd.to_numeric(list(last)),
+        "Previous Close": pd.to_numeric(list(prev)),
+        "Market Cap": pd.to_numeric(list(cap))
+    })
+
+def _download_stocks(stock_symbols, **kwargs):
+    """Batched, threaded yfinance download for all symbols, columns grouped by ticker."""
+    return yf.download(" ".join(stock_symbols), group_by="ticker", threads=True, progress=False, **kwargs)
+
+@st.cache_data(persist="disk", max_entries=256, show_spinner=False)
+def _fetch_stock_closed_days(stock_symbols, end_date):
+    """Fetch MAX_HISTORY_DAYS of daily history up to (not including) end_date; persisted to disk."""
+    hist = _download_stocks(stock_symbols, start=end_date - timedelta(days=MAX_HISTORY_DAYS), end=end_date)
+    if hist.empty:
+        raise ValueError(f"No price history returned for {stock_symbols}")
     return hist
 
-@st.cache_data(ttl=120)
-def fetch_english_finance_news(api_key, max_articles=5):
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_stock_today_partial(stock_symbols):
+    """Fetch the latest (possibly still-open) daily bar."""
+    return _download_stocks(stock_symbols, period="1d")
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_all_stock_historical(stock_symbols, days=30):
+    """Fetch historical data for the last X days for every symbol, keyed by symbol."""
+    if not stock_symbols:
+        return {}
+    # yfinance reads dates in the exchange's timezone, so "closed" means before
+    # today's US session, not before the server's local midnight
+    today = datetime.now(ZoneInfo("America/New_York")).date()
+    try:
+        closed = _fetch_stock_closed_days(stock_symbols, today)
+    except ValueError:
+        return {}
+    closed = closed[closed.index.date >= today - timedelta(days=days)]
+    hist = pd.concat([closed, _fetch_stock_today_partial(stock_symbols)])
+    hist = hist[~hist.index.duplicated(keep="last")]
+    downloaded = set(hist.columns.get_level_values(0))
+    return {
+        symbol: hist[symbol].dropna(how="all") if symbol in downloaded else pd.DataFrame()
+        for symbol in stock_symbols
+    }
+
+@st.cache_resource(show_spinner=False)
+def get_sentiment():
+    """VADER analyzer, built once per process; much faster than TextBlob on headlines."""
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    return SentimentIntensityAnalyzer()
+
+NEWS_URL = "https://newsapi.org/v2/everything"
+
+# Kept in memory only: disk-persisted caches can't honour a ttl, and news goes
+# stale long before a persisted copy would be useful after a restart
+@st.cache_data(ttl="15m", max_entries=64, show_spinner=False)
+def _fetch_news(api_key, max_articles):
     """
     Fetch English news about stocks OR crypto from NewsAPI,
     sort by date, return top articles + sentiment.
     """
-    url = (
-        "https://newsapi.org/v2/everything?"
-        "q=stocks%20OR%20crypto"
-        "&language=en"
-        "&sortBy=publishedAt"
-        f"&apiKey={api_key}"
+    resp = get_http_session().get(
+        NEWS_URL,
+        params={"q": "stocks OR crypto", "language": "en", "sortBy": "publishedAt"},
+        headers={"X-Api-Key": api_key},
+        timeout=5,
     )
-    resp = requests.get(url)
-    articles = []
-    avg_sentiment = 0.0
+    resp.raise_for_status()
 
-    if resp.status_code == 200:
-        data = resp.json()
-        raw_articles = data.get("articles", [])
-        selected = raw_articles[:max_articles]
-        sentiments = []
-
-        for art in selected:
-            title = art.get("title", "")
-            desc = art.get("description", "")
-            content = title + " " + (desc or "")
-            polarity = TextBlob(content).sentiment.polarity
-            sentiments.append(polarity)
-
-            articles.append({
-                "title": title,
-                "description": desc,
-                "url": art.get("url", ""),
-                "source": art["source"]["name"],
-                "publishedAt": art.get("publishedAt", ""),
-                "sentiment": round(polarity, 3)
-            })
-
-        if sentiments:
-            avg_sentiment = sum(sentiments) / len(sentiments)
-    else:
-        st.warning("Error fetching news. Check your API key and try again.")
+    data = orjson.loads(resp.content)
+    raw_articles = data.get("articles", [])
+    selected = raw_articles[:max_articles]
+
+    analyzer = get_sentiment()
+    contents = [(art.get("title") or "") + " " + (art.get("description") or "") for art in selected]
+    sentiments = [analyzer.polarity_scores(content)["compound"] for content in contents]
+
+    articles = [
+        {
+            "title": art.get("title", ""),
+            "description": art.get("description", ""),
+            "url": art.get("url", ""),
+            "source": art["source"]["name"],
+            "publishedAt": art.get("publishedAt", ""),
+            "sentiment": round(polarity, 3)
+        }
+        for art, polarity in zip(selected, sentiments)
+    ]
+
+    avg_sentiment = float(np.mean(sentiments)) if sentiments else 0.0
 
     return articles, avg_sentiment
 
+def fetch_english_finance_news(api_key, max_articles=5):
+    """
+    Return (articles, avg_sentiment, failed), cached for 15 minutes.
+    Errors are reported via `failed` rather than st.* calls, since this also
+    runs in a loader thread before the tabs exist.
+    """
+    try:
+        articles, avg_sentiment = _fetch_news(api_key, max_articles)
+        return articles, avg_sentiment, False
+    except (requests.RequestException, orjson.JSONDecodeError):
+        return [], 0.0, True
+
 ##########################
 # 2. DEFAULT SYMBOL LISTS #
 ##########################
@@ -138,30 +271,44 @@ default_stocks = ["AAPL", "GOOGL", "MSFT", "AMZN", "TSLA", "NVDA"]
 ##########################
 # 3. INITIAL DATA LOADING #
 ##########################
-if 'crypto_df' not in st.session_state:
-    st.session_state.crypto_df = fetch_crypto_data(default_crypto)
-if 'stock_df' not in st.session_state:
-    st.session_state.stock_df = fetch_stock_data(default_stocks)
+# The sources are independent, so load them concurrently: a page load then
+# waits on the slowest source instead of the sum of all of them. This is the
+# only place the tables and charts are fetched each rerun; st.cache_data's ttl
+# decides when they actually hit the network. Histories for every symbol are
+# prefetched so switching the chart selectbox never waits on the network.
+news_api_key = st.session_state.get("news_api_key", "")
+with st.spinner("Loading market data..."), _script_ctx_pool(6) as ex:
+    crypto_future = ex.submit(fetch_crypto_data, tuple(default_crypto))
+    stock_future = ex.submit(fetch_stock_data, tuple(default_stocks))
+    crypto_hist_future = ex.submit(fetch_all_crypto_historical, tuple(default_crypto))
+    stock_hist_future = ex.submit(fetch_all_stock_historical, tuple(default_stocks))
+    news_future = None
+    if news_api_key:
+        # Build the sentiment analyzer (lexicon load) while NewsAPI is still responding
+        ex.submit(get_sentiment)
+        news_future = ex.submit(fetch_english_finance_news, news_api_key)
+st.session_state.crypto_df = crypto_future.result()
+st.session_state.stock_df = stock_future.result()
+st.session_state.crypto_hist = crypto_hist_future.result()
+st.session_state.stock_hist = stock_hist_future.result()
+st.session_state.news = (news_api_key, news_future.result()) if news_future else None
 
 ###################
 # 4. CREATE THE TABS
 ###################
-tabs = st.tabs(["Crypto", "Stocks", "News & Sentiment"])
+# Each tab body is a fragment, so interacting with one tab's widgets reruns
+# only that tab instead of the whole script (and its fetches).
 
 ########### Crypto Tab ###########
-with tabs[0]:
+@st.fragment
+def crypto_tab():
     st.header("Cryptocurrency Prices (via Binance)")
     
-    # Table Display with Placeholder
-    crypto_table_placeholder = st.empty()
-    crypto_table_placeholder.dataframe(st.session_state.crypto_df)
-    
-    # Refresh Table
-    with st.spinner("Running: Fetching new crypto data"):
-        new_crypto_df = fetch_crypto_data(default_crypto)
-        if not new_crypto_df.equals(st.session_state.crypto_df):
-            st.session_state.crypto_df = new_crypto_df
-            crypto_table_placeholder.dataframe(st.session_state.crypto_df)
+    # Table Display
+    st.dataframe(
+        st.session_state.crypto_df,
+        column_config={"Price Change (%)": st.column_config.NumberColumn(format="%.2f%%")}
+    )
 
     # Chart Section
     selected_crypto = st.selectbox(
@@ -170,32 +317,17 @@ with tabs[0]:
     )
     
     if selected_crypto:
-        chart_placeholder = st.empty()
-        if 'crypto_chart' in st.session_state:
-            chart_placeholder.line_chart(st.session_state.crypto_chart.get(selected_crypto, pd.DataFrame()))
-        
-        with st.spinner("Running: Fetching new crypto chart data"):
-            new_hist = fetch_crypto_historical(selected_crypto, days=30)
-            if not new_hist.empty:
-                if 'crypto_chart' not in st.session_state:
-                    st.session_state.crypto_chart = {}
-                st.session_state.crypto_chart[selected_crypto] = new_hist
-                chart_placeholder.line_chart(new_hist["Close"])
+        hist = st.session_state.crypto_hist.get(selected_crypto, pd.DataFrame())
+        if not hist.empty:
+            st.line_chart(hist["Close"])
 
 ########### Stocks Tab ###########
-with tabs[1]:
+@st.fragment
+def stock_tab():
     st.header("Stock Market Data (via yahoo finance)")
     
-    # Table Display with Placeholder
-    stock_table_placeholder = st.empty()
-    stock_table_placeholder.dataframe(st.session_state.stock_df)
-    
-    # Refresh Table
-    with st.spinner("Running: Fetching new stock data"):
-        new_stock_df = fetch_stock_data(default_stocks)
-        if not new_stock_df.equals(st.session_state.stock_df):
-            st.session_state.stock_df = new_stock_df
-            stock_table_placeholder.dataframe(st.session_state.stock_df)
+    # Table Display
+    st.dataframe(st.session_state.stock_df)
 
     # Chart Section
     selected_stock = st.selectbox(
@@ -204,29 +336,28 @@ with tabs[1]:
     )
     
     if selected_stock:
-        chart_placeholder = st.empty()
-        if 'stock_chart' in st.session_state:
-            chart_placeholder.line_chart(st.session_state.stock_chart.get(selected_stock, pd.DataFrame()))
-        
-        with st.spinner("Running: Fetching new stock chart data"):
-            new_hist = fetch_stock_historical(selected_stock, period="1mo")
-            if not new_hist.empty:
-                if 'stock_chart' not in st.session_state:
-                    st.session_state.stock_chart = {}
-                st.session_state.stock_chart[selected_stock] = new_hist
-                chart_placeholder.line_chart(new_hist["Close"])
+        hist = st.session_state.stock_hist.get(selected_stock, pd.DataFrame())
+        if not hist.empty:
+            st.line_chart(hist["Close"])
 
 ########### News & Sentiment Tab ###########
-with tabs[2]:
+@st.fragment
+def news_tab():
     st.header("AI-Driven Financial News & Sentiment")
     
     news_placeholder = st.empty()
     sentiment_placeholder = st.empty()
-    api_key = st.text_input("Enter your NewsAPI key (required)", type="password")
+    api_key = st.text_input("Enter your NewsAPI key (required)", type="password", key="news_api_key")
     
     if api_key:
         with st.spinner("Fetching latest news..."):
-            articles, avg_sentiment = fetch_english_finance_news(api_key)
+            prefetched = st.session_state.get("news")
+            if prefetched is not None and prefetched[0] == api_key:
+                articles, avg_sentiment, failed = prefetched[1]
+            else:
+                articles, avg_sentiment, failed = fetch_english_finance_news(api_key)
+            if failed:
+                st.warning("Error fetching news. Check your API key and try again.")
             
             if articles:
                 with news_placeholder.container():
@@ -251,4 +382,15 @@ with tabs[2]:
             else:
                 news_placeholder.warning("No news articles found or invalid API key.")
     else:
-        news_placeholder.info("Please enter your NewsAPI key to see the latest English financial news (stocks OR crypto).")
\ No newline at end of file
+        news_placeholder.info("Please enter your NewsAPI key to see the latest English financial news (stocks OR crypto).")
+
+tabs = st.tabs(["Crypto", "Stocks", "News & Sentiment"])
+
+with tabs[0]:
+    crypto_tab()
+
+with tabs[1]:
+    stock_tab()
+
+with tabs[2]:
+    news_tab()